@@ -1,6 +1,9 @@
 import itertools
 import random
-from copy import deepcopy
+import sys
+from collections import deque
+
+import numpy as np
 
 
 class Minesweeper():
@@ -10,26 +13,25 @@ class Minesweeper():
 
     def __init__(self, height=8, width=8, mines=8):
 
-        # Set initial width, height, and number of mines
+        # Set initial width and height
         self.height = height
         self.width = width
-        self.mines = set()
 
         # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
-
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        self.board = np.zeros((height, width), dtype=bool)
+
+        # Add mines randomly, sampling distinct cells without replacement
+        # (drawn from the random module, so random.seed reproduces a board)
+        idx = random.sample(range(height * width), mines)
+        self.board.flat[idx] = True
+        self.mines = {divmod(k, width) for k in idx}
+
+        # Bitboard of the same field, one width-bit int per row: bit j of row i is set iff (i, j) is a mine
+        packed = np.packbits(self.board, axis=1, bitorder="little")
+        self.board_rows = [int.from_bytes(row.tobytes(), "little") for row in packed]
+
+        # Grid of neighbouring mine counts for the whole board, built on first use by nearby_mines_all
+        self._nearby_grid = None
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -39,19 +41,17 @@ class Minesweeper():
         Prints a text-based representation
         of where mines are located.
         """
-        for i in range(self.height):
-            print("--" * self.width + "-")
-            for j in range(self.width):
-                if self.board[i][j]:
-                    print("|X", end="")
-                else:
-                    print("| ", end="")
-            print("|")
-        print("--" * self.width + "-")
+        # Builds the whole frame as one string and writes it in a single call
+        separator = "--" * self.width + "-\n"
+        rows = [
+            separator + "".join("|X" if isMine else "| " for isMine in row) + "|\n"
+            for row in self.board.tolist()
+        ]
+        sys.stdout.write("".join(rows) + separator)
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool((self.board_rows[i] >> j) & 1)
 
     def nearby_mines(self, cell):
         """
@@ -60,23 +60,36 @@ class Minesweeper():
         not including the cell itself.
         """
 
-        # Keep count of nearby mines
+        # Shift each in-bounds row of the window down to bit 0 and
+        # popcount its (up to) 3 columns, clipped at the board edges
+        i, j = cell
+        left = max(0, j - 1)
+        window = (1 << (min(self.width, j + 2) - left)) - 1
         count = 0
+        for row in self.board_rows[max(0, i - 1):i + 2]:
+            count += ((row >> left) & window).bit_count()
 
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
+        # The window includes the cell itself, which is not a neighbour
+        return count - self.is_mine(cell)
 
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
+    def nearby_mines_all(self):
+        """
+        Returns a read-only (height, width) array holding, for every cell,
+        the number of mines within one row and column of that cell,
+        not including the cell itself.
+        """
 
-        return count
+        # Mines never move after __init__, so the grid is computed once:
+        # the board is zero-padded and its eight shifted copies are summed
+        if self._nearby_grid is None:
+            padded = np.pad(self.board.astype(np.uint8), 1)
+            grid = np.zeros((self.height, self.width), dtype=np.uint8)
+            for di, dj in itertools.product(range(3), repeat=2):
+                if (di, dj) != (1, 1):
+                    grid += padded[di:di + self.height, dj:dj + self.width]
+            grid.setflags(write=False)
+            self._nearby_grid = grid
+        return self._nearby_grid
 
     def won(self):
         """
@@ -92,6 +105,8 @@ class Sentence():
     and a count of the number of those cells which are mines.
     """
 
+    __slots__ = ('cells', 'count')
+
     def __init__(self, cells, count):
         self.cells = set(cells)
         self.count = count
@@ -109,7 +124,7 @@ class Sentence():
         if len(self.cells) == self.count:
             return self.cells
         else:
-            return set() 
+            return set()
 
     def known_safes(self):
         """
@@ -125,21 +140,16 @@ class Sentence():
         Updates internal knowledge representation given the fact that
         a cell is known to be a mine.
         """
-        for iterableCell in self.cells:
-            if iterableCell == cell:
-                self.count -= 1
-                self.cells.remove(cell)
-                break
+        if cell in self.cells:
+            self.cells.discard(cell)
+            self.count -= 1
 
     def mark_safe(self, cell):
         """
         Updates internal knowledge representation given the fact that
         a cell is known to be safe.
         """
-        for iterableCell in self.cells:
-            if iterableCell == cell:
-                self.cells.remove(cell)
-                break
+        self.cells.discard(cell)
 
 
 class MinesweeperAI():
@@ -160,26 +170,180 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
+        # Safe cells that have not been played yet, plus the sizes of self.safes and self.moves_made
+        # it was last in line with, so that callers editing either set directly can be spotted cheaply
+        self._pending_safes = set()
+        self._pending_sizes = (0, 0)
+
         # List of sentences about the game known to be true
+        # Callers may append sentences to it, remove them or replace the list between moves;
+        # sentences already in it are owned by the AI and should not be edited in place
         self.knowledge = []
 
+        # The list object and length self.knowledge had when the AI last wrote it,
+        # so caller changes can be detected without rescanning it
+        self._published = (self.knowledge, 0)
+
+        # Bit for each cell when a set of cells is encoded as an integer bitmask (bit i*width+j for cell (i, j))
+        self._cell_bits = {(i, j): 1 << (i * width + j) for i in range(height) for j in range(width)}
+
+        # The same sentences indexed by their cell bitmask (at most one sentence per set of cells),
+        # and by each cell they contain, so only sentences touched by a new fact need revisiting
+        self._sentences = {}
+        self._cell_sentences = {}
+
+        # Sentences that were added or lost a cell and still need to be checked for new inferences
+        self._worklist = deque()
+
+        # Cells that have not been chosen and are not known to be mines, as a list for O(1) random choice
+        # plus each cell's position in that list for O(1) swap-removal
+        self._candidates = [(i, j) for i in range(height) for j in range(width)]
+        self._candidate_positions = {cell: k for k, cell in enumerate(self._candidates)}
+
+        # The board geometry never changes, so each cell's in-bounds neighbours are computed once up front
+        self._neighbours = {}
+        for i in range(height):
+            for j in range(width):
+                self._neighbours[(i, j)] = frozenset(
+                    (i + di, j + dj)
+                    for di, dj in itertools.product(range(-1, 2), repeat=2)
+                    if (di or dj) and 0 <= i + di < height and 0 <= j + dj < width
+                )
+
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
-        self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self._adopt_knowledge()
+        self._mark_mine(cell)
+        self._publish_knowledge()
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
+        self._adopt_knowledge()
+        self._mark_safe(cell)
+        self._publish_knowledge()
+
+    def _mark_mine(self, cell):
+        '''
+        Marks a cell as a mine in the indexed knowledge, re-queuing every sentence that contained it
+        '''
+        self.mines.add(cell)
+        self._discard_candidate(cell)
+        for sentence in self._cell_sentences.pop(cell, []):
+            if self._is_known(sentence):
+                del self._sentences[self._bits(sentence.cells)]
+                sentence.mark_mine(cell)
+                self._file_sentence(sentence)
+
+    def _mark_safe(self, cell):
+        '''
+        Marks a cell as safe in the indexed knowledge, re-queuing every sentence that contained it
+        '''
+        inSync = self._pending_sizes == self._safe_move_sizes()
         self.safes.add(cell)
+        if cell not in self.moves_made:
+            self._pending_safes.add(cell)
+        if inSync:
+            self._pending_sizes = self._safe_move_sizes()
+        for sentence in self._cell_sentences.pop(cell, []):
+            if self._is_known(sentence):
+                del self._sentences[self._bits(sentence.cells)]
+                sentence.mark_safe(cell)
+                self._file_sentence(sentence)
+
+    def _adopt_knowledge(self):
+        '''
+        Brings the indexes back in line with self.knowledge, which callers may have changed directly
+        Sentences no longer in self.knowledge are forgotten, and sentences whose cells were edited are re-indexed
+        Sentences added to self.knowledge are brought up to date with the known mines and safes,
+        and then indexed and queued like any new sentence
+        Does nothing if self.knowledge is still the list, at the length, that the AI last wrote
+        '''
+        knowledge, length = self._published
+        if self.knowledge is knowledge and len(self.knowledge) == length:
+            return
+
+        held = {id(sentence) for sentence in self.knowledge}
+        for bits, sentence in list(self._sentences.items()):
+            if id(sentence) not in held or self._bits(sentence.cells) != bits:
+                del self._sentences[bits]
+
         for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+            if self._is_known(sentence):
+                continue
+            for cell in list(sentence.cells):
+                if cell in self.mines:
+                    sentence.mark_mine(cell)
+                elif cell in self.safes:
+                    sentence.mark_safe(cell)
+            self._add_sentence(sentence)
+
+    def _safe_move_sizes(self):
+        '''
+        Returns the sizes of self.safes and self.moves_made, which change whenever either set is edited
+        '''
+        return len(self.safes), len(self.moves_made)
+
+    def _publish_knowledge(self):
+        '''
+        Writes the indexed sentences back into self.knowledge, dropping any that were resolved or merged
+        '''
+        self.knowledge[:] = self._sentences.values()
+        self._published = (self.knowledge, len(self.knowledge))
+
+    def _discard_candidate(self, cell):
+        '''
+        Removes a cell from the random move candidates by swapping the last candidate into its place
+        '''
+        position = self._candidate_positions.pop(cell, None)
+        if position is None:
+            return
+        last = self._candidates.pop()
+        if last != cell:
+            self._candidates[position] = last
+            self._candidate_positions[last] = position
+
+    def _bits(self, cells):
+        '''
+        Returns the integer bitmask encoding a set of cells on this board
+        '''
+        bits = 0
+        for cell in cells:
+            bits |= self._cell_bits[cell]
+        return bits
+
+    def _is_known(self, sentence):
+        '''
+        Returns True if the sentence is the one currently held in knowledge for its set of cells
+        (index entries for sentences that have since been dropped are cleaned up lazily)
+        '''
+        return self._sentences.get(self._bits(sentence.cells)) is sentence
+
+    def _file_sentence(self, sentence):
+        '''
+        Indexes a sentence under its cell bitmask and queues it for propagation
+        Sentences with no cells, or with the same cells as a sentence already known, are dropped
+        Returns True if the sentence was kept
+        '''
+        bits = self._bits(sentence.cells)
+        if not bits or bits in self._sentences:
+            return False
+        self._sentences[bits] = sentence
+        self._worklist.append(sentence)
+        return True
+
+    def _add_sentence(self, sentence):
+        '''
+        Adds a new sentence to knowledge and registers it under each of its cells
+        '''
+        if self._file_sentence(sentence):
+            for cell in sentence.cells:
+                self._cell_sentences.setdefault(cell, []).append(sentence)
 
     def find_uncertain_neighbours(self, cell, count):
         '''
@@ -196,139 +360,87 @@ class MinesweeperAI():
         '''
         
         # Set to contain coordinates of all neighbouring cells of which the status is uncertain
-        # (i.e. we don't know if it is safe or a mine)
-        cellNeighbours = set()
-
-        # Adds all possible neighbouring cells to the set, given the input cell's location
-        # (i.e. it is not possible for a cell in the top row to have a neighbour above it, etc.)
-        # top left
-        if cell[0] > 0 and cell[1] > 0:
-            cellNeighbours.add((cell[0]-1, cell[1]-1))
-        # top centre
-        if cell[0] > 0:
-            cellNeighbours.add((cell[0]-1, cell[1]))
-        # top right
-        if cell[0] > 0 and cell[1] < self.width-1:
-            cellNeighbours.add((cell[0]-1, cell[1]+1))
-        # middle left
-        if cell[1] > 0:
-            cellNeighbours.add((cell[0], cell[1]-1))
-        # middle right
-        if cell[1] < self.width-1:
-            cellNeighbours.add((cell[0], cell[1]+1))
-        # bottom left
-        if cell[0] < self.height-1 and cell[1] > 0:
-            cellNeighbours.add((cell[0]+1, cell[1]-1))
-        # bottom centre
-        if cell[0] < self.height-1:
-            cellNeighbours.add((cell[0]+1, cell[1]))
-        # bottom right
-        if cell[0] < self.height-1 and cell[1] < self.width-1:
-            cellNeighbours.add((cell[0]+1, cell[1]+1))
-
-        # Deepcopy made as changing a set within the loop causes an error
-        neighboursCopy = deepcopy(cellNeighbours)
+        # (i.e. we don't know if it is safe or a mine), starting from the cell's precomputed neighbours
+        cellNeighbours = set(self._neighbours[cell])
 
         # If a neighbour is already known to be a mine or safe, it is removed from the set and count is changed accordingly
-        for individualCell in cellNeighbours:
-            if individualCell in self.mines:
-                neighboursCopy.remove(individualCell)
-                count -= 1
-            if individualCell in self.safes:
-                neighboursCopy.remove(individualCell)
-
-        # cellNeighbours now updated to exclude known mines and safes
-        cellNeighbours = deepcopy(neighboursCopy)
+        count -= len(cellNeighbours & self.mines)
+        cellNeighbours -= self.mines
+        cellNeighbours -= self.safes
+
         # If every remaining neighbour is known to be a safe
         if count == 0:
             # Add all neighbours to safes and return none
             for neighbour in cellNeighbours:
-                self.mark_safe(neighbour)
+                self._mark_safe(neighbour)
             return Sentence(set(), None)
         # If every remaining neighbour is known to be a mine
         elif count == len(cellNeighbours):
             # Add all neighbours to mines and return none
             for neighbour in cellNeighbours:
-                self.mark_mine(neighbour)
+                self._mark_mine(neighbour)
             return Sentence(set(), None)
         else:
             # Otherwise just return a sentence of neighbour cells against number of mines
             return Sentence(cellNeighbours, count)
 
-    def knowledge_cleanup(self):
+    def subtract_overlapping(self, sentence):
         '''
-        Removes duplicate sentences in self.knowledge
-        Removes empty sentences
+        Runs set subtraction between a sentence and every known sentence sharing a cell with it
+        (a sentence sharing no cells can be neither a subset nor a superset of it)
+        Differences not already in knowledge are added as new sentences
         '''
-        # Will contain exactly one copy of the sentences which appear more than once in self.knowledge
-        badList = []
-        # Will contain exactly one copy of the sentences which appear only once in self.knowledge
-        goodList = []
-
-        # For each sentence in self.knowledge
-        for sentenceNum in range(len(self.knowledge)):
-            # For each sentence between the currently selected sentence and the end of self.knowledge
-            for nestedSentenceNum in range(sentenceNum+1, len(self.knowledge)):
-                # If the two selected sentences have the same cells and the sentence does not already appear in badlist, add to badlist
-                if self.knowledge[sentenceNum].cells == self.knowledge[nestedSentenceNum].cells and self.knowledge[sentenceNum] not in badList:
-                    badList.append(self.knowledge[sentenceNum])
-        
-        # For each sentence not in badlist (i.e. sentences which only appeared once) add to goodlist
-        for sentence in self.knowledge:
-            if sentence not in badList:
-                goodList.append(sentence)
-        
-        # Set self.knowledge equal to goodlist plus badlist (i.e. the list containing exactly one copy of each sentence)
-        self.knowledge = deepcopy(goodList+badList)
+        # Collects each overlapping sentence once, dropping index entries for sentences no longer held
+        overlapping = {}
+        for cell in sentence.cells:
+            cellSentences = self._cell_sentences[cell]
+            cellSentences[:] = [other for other in cellSentences if self._is_known(other)]
+            for other in cellSentences:
+                if other is not sentence:
+                    overlapping[id(other)] = other
+
+        # Set subtraction, with the subset tests done on cell bitmasks:
+        # a is a subset of b iff (a & b) == a
+        firstBits = self._bits(sentence.cells)
+        for other in overlapping.values():
+            secondBits = self._bits(other.cells)
+            # If the sentence is a subset of the other...
+            if firstBits & secondBits == firstBits:
+                difference = other.cells - sentence.cells
+                count = other.count - sentence.count
+            # Otherwise if the other is a subset of the sentence...
+            elif firstBits & secondBits == secondBits:
+                difference = sentence.cells - other.cells
+                count = sentence.count - other.count
+            else:
+                continue
+
+            # Add the difference to knowledge (duplicates and empty differences are dropped)
+            self._add_sentence(Sentence(difference, count))
+
+    def propagate_knowledge(self):
+        '''
+        Works through the queue of added or changed sentences until nothing new can be inferred
+        Sentences whose cells are all safes or all mines are resolved and marked
+        Any other sentence is subtracted against the sentences it overlaps
+        Marking a cell re-queues every sentence containing it
+        '''
+        while self._worklist:
+            sentence = self._worklist.popleft()
+            # Skips sentences that were dropped or changed (and so re-queued) since being queued
+            if not self._is_known(sentence):
+                continue
 
-        # Removes empty sentences
-        for sentence in self.knowledge:
-            if sentence.count == len(sentence.cells):
+            if sentence.count == 0:
                 for cell in list(sentence.cells):
-                    self.mark_mine(cell)
-                self.knowledge.remove(sentence)
-            elif sentence.count == 0:
+                    self._mark_safe(cell)
+            elif sentence.count == len(sentence.cells):
                 for cell in list(sentence.cells):
-                    self.mark_safe(cell)
-                self.knowledge.remove(sentence)            
-
-    def blanket_set_subtraction(self):
-        # Set subtraction
-        originalLength = len(self.knowledge)
-        # Loops thorugh all sets in knowledge
-        for sentenceNum in range(len(self.knowledge)):
-            firstSet = self.knowledge[sentenceNum]
-            
-            # Loops through all sets between the current set and the end of knowledge
-            for nestedSentenceNum in range(sentenceNum+1, originalLength):
-                secondSet = self.knowledge[nestedSentenceNum]
-                # If the first set is a subset of the second...
-                if firstSet.cells.issubset(secondSet.cells):
-                    sentenceAlreadyAdded = False
-                    
-                    for sentence in self.knowledge:
-                        if sentence.cells == secondSet.cells.difference(firstSet.cells):
-                            sentenceAlreadyAdded = True
-                    
-                    # And the symmetric difference between the sets has not already been added to knowledge...
-                    if not sentenceAlreadyAdded:
-                        # Add the symmetric difference to knowledge
-                        self.knowledge.append(Sentence(secondSet.cells.difference(
-                            firstSet.cells), secondSet.count-firstSet.count))
-                
-                # Otherwise if the second set is a subset of the first...
-                elif secondSet.cells.issubset(firstSet.cells):
-                    sentenceAlreadyAdded = False
-
-                    for sentence in self.knowledge:
-                        if sentence.cells == firstSet.cells.difference(secondSet.cells):
-                            sentenceAlreadyAdded = True
-                    
-                    # And the symmetric difference between the sets has not already been added to knowledge...
-                    if not sentenceAlreadyAdded:
-                        # Add the symmetric difference to knowledge
-                        self.knowledge.append(Sentence(firstSet.cells.difference(
-                            secondSet.cells), firstSet.count - secondSet.count))
+                    self._mark_mine(cell)
+            else:
+                self.subtract_overlapping(sentence)
+
+        self._publish_knowledge()
 
     def add_knowledge(self, cell, count):
         """
@@ -345,36 +457,38 @@ class MinesweeperAI():
             Done
             4) mark any additional cells as safe or as mines
                if it can be concluded based on the AI's knowledge base
-            Done?
+            Done
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
+            Done
 
         """
+        # Picks up any sentences added to or removed from self.knowledge since the last move
+        self._adopt_knowledge()
+
         # Marks the input cell as a move that has been made
+        inSync = self._pending_sizes == self._safe_move_sizes()
         self.moves_made.add(cell)
+        self._pending_safes.discard(cell)
+        if inSync:
+            self._pending_sizes = self._safe_move_sizes()
+        self._discard_candidate(cell)
 
         # Marks the input cell as a safe cell
-        self.mark_safe(cell)
+        self._mark_safe(cell)
 
         # Contains a sentence regarding neighbours to the input cell, of which we are not sure of the status
         # (i.e we don't know if the neighbours are mines or safes)
-        uncertainNeighbours = deepcopy(self.find_uncertain_neighbours(cell, count))
+        uncertainNeighbours = self.find_uncertain_neighbours(cell, count)
 
         # If there are neighbouring cells which we don't already know the state of
         # AND we don't know for sure based on count whether or not they are mines 
         if uncertainNeighbours.count != None:
             # Add a sentence based on this information to self.knowledge
-            self.knowledge.append(uncertainNeighbours)
-
-        # Remove duplicates and empty sentences from self.knowledge
-        self.knowledge_cleanup()
+            self._add_sentence(uncertainNeighbours)
 
-        # Runs set subtraction on all sets in self.knowledge
-        self.blanket_set_subtraction()
-
-        # Runs again, this time not to check for duplicates or empty cells,
-        # but to check if subtraction resulted in any additional mines/safes (and mark them)
-        self.knowledge_cleanup()
+        # Marks any mines/safes and adds any new sentences that follow from the sentences affected by this move
+        self.propagate_knowledge()
 
     def make_safe_move(self):
         """
@@ -385,13 +499,12 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        untouchedSafes = self.safes.difference(self.moves_made)
-        
-        if untouchedSafes == set():
-            return None
-        else:
-            for safe in untouchedSafes:
-                return safe
+        # Rebuilds the unplayed safes if self.safes or self.moves_made were edited outside the AI
+        if self._pending_sizes != self._safe_move_sizes():
+            self._pending_safes = self.safes - self.moves_made
+            self._pending_sizes = self._safe_move_sizes()
+
+        return next(iter(self._pending_safes), None)
 
     def make_random_move(self):
         """
@@ -401,16 +514,11 @@ class MinesweeperAI():
             2) are not known to be mines
         """
 
-        allCells = set()
-
-        for y in range(self.height):
-            for x in range(self.width):
-                allCells.add((y, x))
-
-        remainingCells = allCells.difference(self.moves_made.union(self.mines))
-
-        if remainingCells == set():
-            return None
-        else:
-            for cell in remainingCells:
+        # Candidates are removed as the AI plays or marks cells, but callers may also have edited
+        # self.moves_made or self.mines directly, so a stale pick is discarded and another drawn
+        while self._candidates:
+            cell = random.choice(self._candidates)
+            if cell not in self.moves_made and cell not in self.mines:
                 return cell
+            self._discard_candidate(cell)
+        return None
@@ -0,0 +1,234 @@
+import contextlib
+import io
+import random
+import unittest
+
+from minesweeper import Minesweeper, MinesweeperAI, Sentence
+
+
+def brute_force_nearby_mines(game, cell):
+    i, j = cell
+    return sum(
+        (a, b) in game.mines
+        for a in range(i - 1, i + 2)
+        for b in range(j - 1, j + 2)
+        if (a, b) != cell
+    )
+
+
+def random_boards():
+    random.seed(0)
+    for height, width, mines in [(1, 1, 0), (1, 1, 1), (1, 9, 4), (9, 1, 4), (3, 7, 10), (8, 8, 8), (16, 30, 99)]:
+        for _ in range(5):
+            yield Minesweeper(height=height, width=width, mines=mines)
+
+
+class MinesweeperTest(unittest.TestCase):
+
+    def test_mines_are_placed(self):
+        for game in random_boards():
+            self.assertTrue(all(0 <= i < game.height and 0 <= j < game.width for i, j in game.mines))
+            self.assertEqual(int(game.board.sum()), len(game.mines))
+
+    def test_board_is_reproducible_with_random_seed(self):
+        random.seed(42)
+        first = Minesweeper().mines
+        random.seed(42)
+        self.assertEqual(Minesweeper().mines, first)
+
+    def test_is_mine_matches_mines(self):
+        for game in random_boards():
+            for i in range(game.height):
+                for j in range(game.width):
+                    self.assertEqual(game.is_mine((i, j)), (i, j) in game.mines)
+
+    def test_nearby_mines_matches_brute_force(self):
+        for game in random_boards():
+            for i in range(game.height):
+                for j in range(game.width):
+                    self.assertEqual(game.nearby_mines((i, j)), brute_force_nearby_mines(game, (i, j)))
+
+    def test_nearby_mines_all_matches_nearby_mines(self):
+        for game in random_boards():
+            grid = game.nearby_mines_all()
+            self.assertEqual(grid.shape, (game.height, game.width))
+            for i in range(game.height):
+                for j in range(game.width):
+                    self.assertEqual(grid[i, j], game.nearby_mines((i, j)))
+                    self.assertEqual(grid[i, j], brute_force_nearby_mines(game, (i, j)))
+
+    def test_nearby_mines_all_is_cached_and_read_only(self):
+        game = Minesweeper(height=4, width=5, mines=6)
+        grid = game.nearby_mines_all()
+
+        self.assertIs(game.nearby_mines_all(), grid)
+        with self.assertRaises(ValueError):
+            grid[0, 0] = 9
+
+
+    def test_print_matches_cell_by_cell_output(self):
+        for game in random_boards():
+            # The original implementation, printing one cell at a time
+            expected = io.StringIO()
+            with contextlib.redirect_stdout(expected):
+                for i in range(game.height):
+                    print("--" * game.width + "-")
+                    for j in range(game.width):
+                        print("|X" if (i, j) in game.mines else "| ", end="")
+                    print("|")
+                print("--" * game.width + "-")
+
+            actual = io.StringIO()
+            with contextlib.redirect_stdout(actual):
+                game.print()
+
+            self.assertEqual(actual.getvalue(), expected.getvalue())
+
+
+
+class MinesweeperAIKnowledgeTest(unittest.TestCase):
+
+    def test_sentence_appended_to_knowledge_is_used(self):
+        ai = MinesweeperAI(height=3, width=3)
+        ai.knowledge.append(Sentence({(0, 1), (0, 2)}, 2))
+
+        ai.add_knowledge((2, 2), 0)
+
+        self.assertTrue({(0, 1), (0, 2)} <= ai.mines)
+
+    def test_sentence_removed_from_knowledge_is_forgotten(self):
+        ai = MinesweeperAI(height=3, width=3)
+        ai.add_knowledge((0, 0), 1)
+        ai.knowledge.clear()
+
+        ai.add_knowledge((2, 2), 1)
+
+        # Only the sentence about (2, 2) remains, so nothing links it to (0, 0)'s neighbours
+        self.assertEqual(ai.mines, set())
+        self.assertEqual([sentence.cells for sentence in ai.knowledge], [{(1, 1), (1, 2), (2, 1)}])
+
+    def test_mark_mine_updates_appended_sentence(self):
+        ai = MinesweeperAI(height=3, width=3)
+        sentence = Sentence({(0, 0), (0, 1)}, 1)
+        ai.knowledge.append(sentence)
+
+        ai.mark_mine((0, 0))
+
+        self.assertEqual(sentence.cells, {(0, 1)})
+        self.assertEqual(sentence.count, 0)
+
+    def test_mark_safe_drops_resolved_sentences_from_knowledge(self):
+        ai = MinesweeperAI(height=3, width=3)
+        ai.knowledge.append(Sentence({(0, 0)}, 0))
+        ai.knowledge.append(Sentence({(1, 1), (1, 2)}, 1))
+
+        ai.mark_safe((0, 0))
+
+        self.assertEqual(ai.knowledge, [Sentence({(1, 1), (1, 2)}, 1)])
+
+    def test_replaced_knowledge_list_is_used(self):
+        ai = MinesweeperAI(height=3, width=3)
+        ai.add_knowledge((0, 0), 1)
+        ai.knowledge = [Sentence({(0, 1), (0, 2)}, 2)]
+
+        ai.add_knowledge((2, 2), 0)
+
+        self.assertTrue({(0, 1), (0, 2)} <= ai.mines)
+
+    def test_inference_chains_within_one_move(self):
+        # {a, b} = 1 and {a, b, c, d} = 2 give {c, d} = 1, which with {c, d, e} = 1 gives e safe
+        ai = MinesweeperAI(height=4, width=4)
+        ai.knowledge.append(Sentence({(0, 0), (0, 1)}, 1))
+        ai.knowledge.append(Sentence({(0, 0), (0, 1), (1, 0), (1, 1)}, 2))
+        ai.knowledge.append(Sentence({(1, 0), (1, 1), (2, 0)}, 1))
+
+        ai.add_knowledge((3, 3), 0)
+
+        self.assertIn((2, 0), ai.safes)
+
+    def test_knowledge_is_at_fixpoint_after_each_move(self):
+        random.seed(1)
+        for _ in range(50):
+            game = Minesweeper(height=8, width=8, mines=10)
+            ai = MinesweeperAI(height=8, width=8)
+            while True:
+                move = ai.make_safe_move() or ai.make_random_move()
+                if move is None or game.is_mine(move):
+                    break
+                ai.add_knowledge(move, game.nearby_mines(move))
+
+                # Everything inferred is true of the actual board
+                self.assertTrue(ai.mines <= game.mines)
+                self.assertFalse(ai.safes & game.mines)
+
+                # No sentence is left unresolved, and no subset difference is left underived
+                knownCells = {frozenset(sentence.cells) for sentence in ai.knowledge}
+                for sentence in ai.knowledge:
+                    self.assertTrue(0 < sentence.count < len(sentence.cells))
+                    for other in ai.knowledge:
+                        if other is not sentence and sentence.cells < other.cells:
+                            self.assertIn(frozenset(other.cells - sentence.cells), knownCells)
+
+
+class MinesweeperAIMoveTest(unittest.TestCase):
+
+    def test_safe_move_uses_edited_safes(self):
+        ai = MinesweeperAI(height=3, width=3)
+        ai.safes.add((0, 0))
+
+        self.assertEqual(ai.make_safe_move(), (0, 0))
+
+    def test_safe_move_respects_edited_moves(self):
+        ai = MinesweeperAI(height=3, width=3)
+        ai.add_knowledge((1, 1), 0)
+        ai.moves_made.update(ai.safes)
+
+        self.assertIsNone(ai.make_safe_move())
+
+    def test_safe_move_is_known_safe_and_unplayed(self):
+        ai = MinesweeperAI(height=3, width=3)
+        ai.add_knowledge((1, 1), 0)
+
+        move = ai.make_safe_move()
+        self.assertIn(move, ai.safes)
+        self.assertNotIn(move, ai.moves_made)
+
+    def test_random_move_respects_edited_moves_and_mines(self):
+        ai = MinesweeperAI(height=1, width=2)
+        ai.moves_made.add((0, 0))
+        ai.mines.add((0, 1))
+
+        self.assertIsNone(ai.make_random_move())
+
+    def test_random_move_avoids_played_cells_and_mines(self):
+        random.seed(2)
+        ai = MinesweeperAI(height=4, width=4)
+        ai.add_knowledge((0, 0), 0)
+        ai.mark_mine((3, 3))
+
+        for _ in range(50):
+            move = ai.make_random_move()
+            self.assertNotIn(move, ai.moves_made | ai.mines)
+
+
+class SentenceTest(unittest.TestCase):
+
+    def test_cells_do_not_depend_on_any_board(self):
+        MinesweeperAI(height=8, width=8)
+        sentence = Sentence({(0, 7), (0, 9), (20, 3)}, 1)
+        MinesweeperAI(height=4, width=4)
+
+        self.assertEqual(sentence.cells, {(0, 7), (0, 9), (20, 3)})
+
+    def test_cells_can_be_edited(self):
+        sentence = Sentence({(0, 0)}, 1)
+        sentence.cells.add((0, 1))
+        sentence.cells.discard((0, 0))
+        self.assertEqual(sentence.cells, {(0, 1)})
+
+        sentence.cells = {(1, 1)}
+        self.assertEqual(sentence.known_mines(), {(1, 1)})
+
+
+if __name__ == "__main__":
+    unittest.main()